@@ -1,14 +1,22 @@
 import os
-from flask import Flask, redirect, url_for
+import click
+from flask import Flask, redirect, url_for, request
 from flask_login import LoginManager, current_user
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.orm import joinedload
+from flask_sqlalchemy.record_queries import get_recorded_queries
 from dotenv import load_dotenv
+from flask_migrate import stamp, upgrade
 
-# Load environment variables
-load_dotenv()
+# Load environment variables once; reloader children and forked workers
+# inherit them, so there is no need to re-read .env in every process
+if not os.environ.get('_DOTENV_LOADED'):
+    load_dotenv()
+    os.environ['_DOTENV_LOADED'] = '1'
 
 # Import extensions and models
-from extensions import mail, csrf, migrate, db
-from models import User
+from extensions import mail, csrf, migrate, db, cache
+from models import User, Student
 
 def create_app(config_name=None):
     """Application factory pattern"""
@@ -21,11 +29,16 @@ def create_app(config_name=None):
     from config import config
     app.config.from_object(config[config_name])
 
+    if app.config.get('JINJA_BYTECODE_CACHE_DIR'):
+        os.makedirs(app.config['JINJA_BYTECODE_CACHE_DIR'], exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['JINJA_BYTECODE_CACHE_DIR'])
+
     # Initialize extensions
     db.init_app(app)
     mail.init_app(app)
     csrf.init_app(app)
-    migrate.init_app(app, db)
+    migrate.init_app(app, db, directory=os.path.join(app.root_path, 'migrations'))
+    cache.init_app(app)
 
     # Initialize Flask-Login
     login_manager = LoginManager()
@@ -36,10 +49,14 @@ def create_app(config_name=None):
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Flask-Login memoizes the result on ``g`` for the rest of the request;
+        # the student profile and class ride along in the same SELECT.
+        return db.session.get(User, int(user_id), options=[
+            joinedload(User.student_profile).joinedload(Student.school_class)
+        ])
 
     # Register blueprints
-    from routes.auth import auth_bp
+    from routes.auth import auth_bp, ROLE_DASHBOARDS
     from routes.admin import admin_bp
     from routes.student import student_bp
 
@@ -47,13 +64,18 @@ def create_app(config_name=None):
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(student_bp, url_prefix='/student')
 
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    @app.cli.command('init-db')
+    def init_db():
+        """Create or upgrade the database tables and create the default admin user."""
+        if db.inspect(db.engine).has_table('users'):
+            upgrade()  # Existing database: apply any pending migrations
+        else:
+            db.create_all()
+            stamp()  # A fresh schema already matches the latest migration
 
         # Create default admin user if not exists
-        admin = User.query.filter_by(email='admin@cbt.com').first()
-        if not admin:
+        admin_exists = db.session.query(db.exists().where(User.email == 'admin@cbt.com')).scalar()
+        if not admin_exists:
             admin = User(
                 email='admin@cbt.com',
                 role='admin',
@@ -62,7 +84,59 @@ def create_app(config_name=None):
             admin.set_password('admin123')  # Change this in production!
             db.session.add(admin)
             db.session.commit()
-            print("Default admin user created: admin@cbt.com / admin123")
+            click.echo("Default admin user created: admin@cbt.com / admin123")
+        else:
+            click.echo("Database already initialized.")
+
+    @app.cli.command('archive-answers')
+    @click.option('--before', required=True, type=click.DateTime(formats=['%Y-%m-%d']),
+                  help='Archive answers of attempts submitted before this date.')
+    @click.option('--to', 'archive_path', default=os.path.join('instance', 'archive.db'), show_default=True,
+                  help='SQLite file the answers are moved to.')
+    def archive_answers(before, archive_path):
+        """Move answers of old submitted attempts into a separate SQLite file.
+
+        Attempt scores and grades stay in the main database; only the
+        per-question answer rows, which make up most of its size, move out.
+        """
+        if db.engine.dialect.name != 'sqlite':
+            raise click.ClickException('archive-answers only supports SQLite databases.')
+
+        old_attempts = ("SELECT id FROM main.attempts "
+                        "WHERE status = 'submitted' AND submitted_at < :before")
+        params = {'before': before.strftime('%Y-%m-%d %H:%M:%S')}
+
+        with db.engine.connect() as conn:
+            # ATTACH/DETACH must run outside a transaction
+            conn.execute(db.text('ATTACH DATABASE :path AS archive'), {'path': os.path.abspath(archive_path)})
+            conn.execute(db.text('CREATE TABLE IF NOT EXISTS archive.answers AS SELECT * FROM main.answers WHERE 0'))
+            conn.execute(db.text(f'INSERT INTO archive.answers SELECT * FROM main.answers '
+                                 f'WHERE attempt_id IN ({old_attempts})'), params)
+            moved = conn.execute(db.text(f'DELETE FROM main.answers WHERE attempt_id IN ({old_attempts})'),
+                                 params).rowcount
+            conn.commit()
+            conn.execute(db.text('DETACH DATABASE archive'))
+
+        click.echo(f"Archived {moved} answers to {archive_path}.")
+
+    # Flag requests that issue suspiciously many queries (likely N+1 lazy loads).
+    # Views marked with @sql_budget(n) are held to n queries, and under
+    # SQL_BUDGET_STRICT going over it fails the request instead of just logging.
+    if app.config.get('SQLALCHEMY_RECORD_QUERIES'):
+        @app.after_request
+        def check_query_count(response):
+            query_count = len(get_recorded_queries())
+            response.headers['X-SQL-Count'] = str(query_count)
+
+            view = app.view_functions.get(request.endpoint)
+            budget = getattr(view, 'sql_budget', None)
+            if query_count > (budget or app.config['QUERY_COUNT_THRESHOLD']):
+                message = (f'{request.method} {request.path} issued {query_count} queries '
+                           f'(budget {budget or app.config["QUERY_COUNT_THRESHOLD"]})')
+                if budget and app.config.get('SQL_BUDGET_STRICT'):
+                    raise AssertionError(message)
+                app.logger.warning(message)
+            return response
 
     # Context processors
     @app.context_processor
@@ -75,12 +149,8 @@ def create_app(config_name=None):
     # Root route
     @app.route('/')
     def index():
-        if current_user.is_authenticated:
-            if current_user.role == 'admin':
-                return redirect(url_for('admin.dashboard'))
-            elif current_user.role == 'student':
-                return redirect(url_for('student.dashboard'))
-        return redirect(url_for('auth.login'))
+        dashboard = ROLE_DASHBOARDS.get(current_user.role) if current_user.is_authenticated else None
+        return redirect(url_for(dashboard or 'auth.login'))
 
     return app
 
@@ -12,6 +12,22 @@ class Config:
     )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Connection pool - sized for exam start/submit bursts; pre-ping and
+    # recycle drop connections the database server has closed while idle
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE') or 10),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW') or 20),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT') or 10),
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+    }
+
+    # Query recording - warn when a request issues more queries than this,
+    # which usually points to an N+1 lazy-load pattern
+    SQLALCHEMY_RECORD_QUERIES = False
+    QUERY_COUNT_THRESHOLD = int(os.environ.get('QUERY_COUNT_THRESHOLD') or 20)
+    SQL_BUDGET_STRICT = False  # Fail, rather than log, views over their @sql_budget
+
     # Ensure instance folder exists
     os.makedirs(os.path.join(BASE_DIR, 'instance'), exist_ok=True)
 
@@ -21,6 +37,14 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
 
+    # Password hashing - full werkzeug method string, e.g. 'scrypt:32768:8:1'
+    # or 'pbkdf2:sha256:600000'; tune the cost to the login load of the host.
+    # Existing hashes are upgraded to this method on the user's next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'scrypt:32768:8:1'
+    # Threads hashing passwords during a bulk student upload; each scrypt hash
+    # holds its own memory, so keep this at or below the host's core count
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1)
+
     # Mail configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER') or 'smtp.gmail.com'
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -29,10 +53,21 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
 
+    # Cache configuration - SimpleCache is per process; set CACHE_TYPE=RedisCache
+    # and CACHE_REDIS_URL (requires the redis package) to share it across workers
+    CACHE_TYPE = os.environ.get('CACHE_TYPE') or 'SimpleCache'
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT') or 300)
+
     # Application settings
     APP_NAME = os.environ.get('APP_NAME') or 'CBT Platform'
     INSTITUTION_NAME = os.environ.get('INSTITUTION_NAME') or 'CDSSM Ibadan'
 
+    # Compiled-template cache shared by worker processes (None disables it);
+    # Jinja already caches templates in memory, this saves recompiling them
+    # every time a worker starts
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+
     # File upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024
     UPLOAD_EXTENSIONS = ['.xlsx', '.xls', '.docx', '.pdf']
@@ -42,12 +77,16 @@ class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_ECHO = False  # Set to True to see SQL queries
+    SQLALCHEMY_RECORD_QUERIES = True
 
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SESSION_COOKIE_SECURE = True
+    TEMPLATES_AUTO_RELOAD = False
+    JINJA_BYTECODE_CACHE_DIR = (os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+                                or os.path.join(BASE_DIR, 'instance', 'jinja_cache'))
 
     # Override with strong secret key
     def __init__(self):
@@ -62,7 +101,12 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # In-memory SQLite uses a single static connection
+    SQLALCHEMY_RECORD_QUERIES = True
+    SQL_BUDGET_STRICT = True
     WTF_CSRF_ENABLED = False
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # Fast hashing for tests only
+    CACHE_TYPE = 'NullCache'
 
 
 config = {
@@ -1,10 +1,46 @@
+import sqlite3
+from flask_caching import Cache
 from flask_mail import Mail
 from flask_wtf.csrf import CSRFProtect
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import MetaData, event
+from sqlalchemy.engine import Engine
+
+# Named constraints, so migrations can drop and recreate them (SQLite
+# reflects unnamed ones with no name to refer to)
+NAMING_CONVENTION = {
+    'ix': 'ix_%(column_0_label)s',
+    'uq': 'uq_%(table_name)s_%(column_0_name)s',
+    'ck': 'ck_%(table_name)s_%(constraint_name)s',
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+    'pk': 'pk_%(table_name)s',
+}
 
 # Initialize extensions
 mail = Mail()
 csrf = CSRFProtect()
-migrate = Migrate()
-db = SQLAlchemy()
\ No newline at end of file
+migrate = Migrate(render_as_batch=True)  # SQLite needs batch mode for ALTER COLUMN
+db = SQLAlchemy(metadata=MetaData(naming_convention=NAMING_CONVENTION))
+cache = Cache()
+
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for concurrent exam submissions.
+
+    WAL lets readers proceed while a student's answers are being written, and
+    NORMAL sync skips the per-commit fsync that WAL makes unnecessary.
+    """
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')  # needed for ON DELETE CASCADE
+    cursor.execute('PRAGMA journal_mode=WAL')  # no-op for :memory: databases
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=30000')
+    cursor.execute('PRAGMA cache_size=-64000')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA mmap_size=268435456')
+    cursor.close()
@@ -1,8 +1,74 @@
+from flask import g, has_request_context
 from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, SelectField, TextAreaField, IntegerField, BooleanField, DateTimeField, SubmitField
 from wtforms.validators import DataRequired, Email, Length, NumberRange, Optional
-from models import SchoolClass, Subject
+from flask_caching.backends import SimpleCache
+from sqlalchemy import event, select
+from extensions import cache
+from models import db, SchoolClass, Subject
+
+# Select-field choices change rarely, so with a shared cache backend they are
+# kept for a short while instead of being re-queried every time a form is
+# instantiated. A per-process SimpleCache is only cleared in the worker that
+# saved the change, and the others would go on rejecting new classes and
+# subjects as "Not a valid choice", so there choices are loaded per request.
+CHOICE_CACHE_TTL = 120
+CHOICE_CACHE_KEYS = ('choices:classes', 'choices:subjects')
+
+
+def _cached_choices(key, loader):
+    """Return cached choices for key, calling loader on a miss or expiry.
+
+    Within a request the first result is pinned on ``g`` so every form
+    rendered by that request shares one snapshot.
+    """
+    snapshot = g.setdefault('choice_snapshot', {}) if has_request_context() else {}
+    if key in snapshot:
+        return snapshot[key]
+
+    shared = not isinstance(cache.cache, SimpleCache)
+    choices = cache.get(key) if shared else None
+    if choices is None:
+        choices = loader()
+        if shared:
+            cache.set(key, choices, timeout=CHOICE_CACHE_TTL)
+
+    snapshot[key] = choices
+    return choices
+
+
+def clear_choice_cache(*args):
+    """Drop all cached choices (also used as a mapper event listener)"""
+    cache.delete_many(*CHOICE_CACHE_KEYS)
+    if has_request_context():
+        g.pop('choice_snapshot', None)
+
+
+for _model in (SchoolClass, Subject):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, clear_choice_cache)
+
+
+def class_choices():
+    """(id, name) choices for every class, ordered by name"""
+    return _cached_choices('choices:classes', lambda: [
+        tuple(row) for row in db.session.execute(
+            select(SchoolClass.id, SchoolClass.name).order_by(SchoolClass.name)
+        )
+    ])
+
+
+def subject_choices():
+    """(id, "Subject - Class") choices for every subject, ordered by name"""
+    return _cached_choices('choices:subjects', lambda: [
+        (subject_id, f"{subject_name} - {class_name}")
+        for subject_id, subject_name, class_name in db.session.execute(
+            select(Subject.id, Subject.name, SchoolClass.name)
+            .join(SchoolClass, Subject.class_id == SchoolClass.id)
+            .order_by(Subject.name)
+        )
+    ])
 
 
 class LoginForm(FlaskForm):
@@ -28,7 +94,7 @@ class SubjectForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(SubjectForm, self).__init__(*args, **kwargs)
-        self.class_id.choices = [(c.id, c.name) for c in SchoolClass.query.order_by(SchoolClass.name).all()]
+        self.class_id.choices = class_choices()
 
 
 class StudentUploadForm(FlaskForm):
@@ -36,13 +102,13 @@ class StudentUploadForm(FlaskForm):
     class_id = SelectField('Class', coerce=int, validators=[DataRequired()])
     excel_file = FileField('Excel File', validators=[
         DataRequired(),
-        FileAllowed(['xlsx', 'xls'], 'Excel files only!')
+        FileAllowed(['xlsx'], 'Excel (.xlsx) files only!')
     ])
     submit = SubmitField('Upload Students')
 
     def __init__(self, *args, **kwargs):
         super(StudentUploadForm, self).__init__(*args, **kwargs)
-        self.class_id.choices = [(c.id, c.name) for c in SchoolClass.query.order_by(SchoolClass.name).all()]
+        self.class_id.choices = class_choices()
 
 
 class ExamForm(FlaskForm):
@@ -59,9 +125,8 @@ class ExamForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(ExamForm, self).__init__(*args, **kwargs)
-        self.subject_id.choices = [(s.id, f"{s.name} - {s.school_class.name}")
-                                   for s in Subject.query.join(SchoolClass).order_by(Subject.name).all()]
-        self.class_id.choices = [(c.id, c.name) for c in SchoolClass.query.order_by(SchoolClass.name).all()]
+        self.subject_id.choices = subject_choices()
+        self.class_id.choices = class_choices()
 
 
 class QuestionForm(FlaskForm):
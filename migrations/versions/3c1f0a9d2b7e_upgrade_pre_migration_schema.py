@@ -0,0 +1,106 @@
+"""Bring databases created before migrations up to the current models
+
+Such databases (the bundled instance/cbt_app.db among them) have plain,
+unnamed foreign keys, no column defaults, none of the lookup indexes and
+exam totals that were recomputed on every view:
+
+- with PRAGMA foreign_keys=ON the plain keys make deleting an exam, attempt
+  or student fail instead of cascading, so they are rebuilt with their
+  ON DELETE actions;
+- rows written by Core INSERTs that leave timestamps to the database would
+  get NULL, so the timestamp columns get a CURRENT_TIMESTAMP default;
+- the indexes the models declare for the exam, question, attempt, answer,
+  student and subject lookups are created;
+- exams.total_marks is recalculated once from the questions, since from here
+  on it is only adjusted by each question change.
+
+Revision ID: 3c1f0a9d2b7e
+Revises:
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f0a9d2b7e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Gives the reflected, unnamed SQLite foreign keys the names the models now use
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s',
+}
+
+# table: ([(column, referred table, ON DELETE)], [timestamp columns])
+TABLES = {
+    'users': ([], ['created_at']),
+    'classes': ([], ['created_at']),
+    'subjects': ([], ['created_at']),
+    'students': ([('user_id', 'users', 'CASCADE'), ('class_id', 'classes', 'RESTRICT')], []),
+    'exams': ([('subject_id', 'subjects', 'CASCADE')], ['created_at', 'updated_at']),
+    'questions': ([('exam_id', 'exams', 'CASCADE')], ['created_at']),
+    'attempts': ([('student_id', 'students', 'CASCADE'), ('exam_id', 'exams', 'CASCADE')], ['started_at']),
+    'answers': ([('attempt_id', 'attempts', 'CASCADE')], ['created_at']),
+}
+
+# (index, table, columns)
+INDEXES = [
+    ('ix_students_class_last_name', 'students', ['class_id', 'last_name']),
+    ('ix_subjects_class_name', 'subjects', ['class_id', 'name']),
+    ('ix_exams_class_status', 'exams', ['class_id', 'status', 'created_at']),
+    ('ix_exams_created_at', 'exams', ['created_at']),
+    ('ix_questions_exam_order', 'questions', ['exam_id', 'order', 'id']),
+    ('ix_attempts_exam_submitted', 'attempts', ['exam_id', 'submitted_at']),
+    ('ix_answers_attempt_covering', 'answers', ['attempt_id', 'question_id', 'marks_obtained']),
+    ('ix_answers_question_id', 'answers', ['question_id']),
+]
+
+
+def _foreign_key_checks(enabled):
+    # Batch mode copies each table and drops the original; with foreign keys
+    # on, SQLite would treat that DROP as a delete of every referenced row.
+    # The pragma is ignored inside a transaction, hence the autocommit block,
+    # which also makes sure the pooled connection gets its checks back.
+    if op.get_bind().dialect.name == 'sqlite':
+        with op.get_context().autocommit_block():
+            op.execute(f"PRAGMA foreign_keys={'ON' if enabled else 'OFF'}")
+
+
+def _rebuild_tables(upgrading):
+    # One batch per table, so each table is copied only once
+    for table, (foreign_keys, timestamps) in TABLES.items():
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred, ondelete in foreign_keys:
+                name = f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'],
+                                            ondelete=ondelete if upgrading else None)
+            for column in timestamps:
+                batch_op.alter_column(column, existing_type=sa.DateTime(),
+                                      server_default=sa.text('(CURRENT_TIMESTAMP)') if upgrading else None)
+
+
+def upgrade():
+    _foreign_key_checks(False)
+    _rebuild_tables(upgrading=True)
+    _foreign_key_checks(True)
+
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+    op.execute(
+        'UPDATE exams SET total_marks = '
+        '(SELECT COALESCE(SUM(marks), 0) FROM questions WHERE questions.exam_id = exams.id)'
+    )
+
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
+
+    _foreign_key_checks(False)
+    _rebuild_tables(upgrading=False)
+    _foreign_key_checks(True)
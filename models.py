@@ -1,7 +1,24 @@
+from flask import current_app
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
-from extensions import db
+from bisect import bisect_right
+from functools import lru_cache
+from types import SimpleNamespace
+from sqlalchemy import event
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm.attributes import get_history
+from extensions import db, cache
+
+# Grade boundaries: a percentage at or above a threshold earns the next grade up
+_GRADE_THRESHOLDS = (40, 50, 60, 75)
+_GRADES = ('F', 'D', 'C', 'B', 'A')
+
+
+def _snapshot(row, exclude=(), **extra):
+    """Detached, picklable copy of a row's column values for the cache"""
+    values = {c.key: getattr(row, c.key) for c in row.__table__.columns if c.key not in exclude}
+    return SimpleNamespace(**values, **extra)
 
 
 class User(UserMixin, db.Model):
@@ -11,41 +28,75 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(20), nullable=False)  # admin or student
+    role = db.Column(db.Enum('admin', 'student', name='user_role'), nullable=False)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
 
     # Relationships
-    student_profile = db.relationship('Student', backref='user', uselist=False, cascade='all, delete-orphan')
+    student_profile = db.relationship('Student', back_populates='user', uselist=False,
+                                      cascade='all, delete-orphan', passive_deletes=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if not check_password_hash(self.password_hash, password):
+            return False
+
+        # Upgrade hashes made with an older method while we have the plaintext
+        if self.password_needs_rehash():
+            self.set_password(password)
+        return True
+
+    def password_needs_rehash(self):
+        method = self.password_hash.split('$', 1)[0]
+        return method != _hash_method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
 
     def __repr__(self):
         return f'<User {self.email} - {self.role}>'
 
 
+@lru_cache(maxsize=None)
+def _hash_method_prefix(method):
+    """The method prefix werkzeug writes for a configured method.
+
+    werkzeug fills in default parameters ('scrypt' becomes 'scrypt:32768:8:1',
+    'pbkdf2:sha256' gets its iteration count), so the configured string is
+    expanded by hashing once rather than compared as given.
+    """
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
 class Student(db.Model):
     """Student profile model"""
     __tablename__ = 'students'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, unique=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, unique=True)
     student_id = db.Column(db.String(50), unique=True, nullable=False)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
-    class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=False)
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.id', ondelete='RESTRICT'), nullable=False)
 
     # Relationships
-    attempts = db.relationship('Attempt', backref='student', lazy=True, cascade='all, delete-orphan')
+    user = db.relationship('User', back_populates='student_profile')
+    school_class = db.relationship('SchoolClass', back_populates='students')
+    attempts = db.relationship('Attempt', back_populates='student', lazy=True,
+                               cascade='all, delete-orphan', passive_deletes=True)
+
+    # The admin list walks classes by name and each class's students by last name
+    __table_args__ = (
+        db.Index('ix_students_class_last_name', 'class_id', 'last_name'),
+    )
 
-    @property
+    @hybrid_property
     def full_name(self):
         return f'{self.first_name} {self.last_name}'
 
+    @full_name.expression
+    def full_name(cls):
+        return cls.first_name + ' ' + cls.last_name
+
     def __repr__(self):
         return f'<Student {self.student_id} - {self.full_name}>'
 
@@ -57,12 +108,12 @@ class SchoolClass(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), nullable=False, unique=True)  # e.g., "JSS 1A"
     level = db.Column(db.String(20))  # JSS1, JSS2, SS1, etc.
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
 
     # Relationships
-    students = db.relationship('Student', backref='school_class', lazy=True)
-    subjects = db.relationship('Subject', backref='school_class', lazy=True)
-    exams = db.relationship('Exam', backref='school_class', lazy=True)
+    students = db.relationship('Student', back_populates='school_class', lazy=True)
+    subjects = db.relationship('Subject', back_populates='school_class', lazy=True)
+    exams = db.relationship('Exam', back_populates='school_class', lazy=True)
 
     def __repr__(self):
         return f'<SchoolClass {self.name}>'
@@ -76,10 +127,17 @@ class Subject(db.Model):
     name = db.Column(db.String(100), nullable=False)
     code = db.Column(db.String(20), unique=True)
     class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
 
     # Relationships
-    exams = db.relationship('Exam', backref='subject', lazy=True, cascade='all, delete-orphan')
+    school_class = db.relationship('SchoolClass', back_populates='subjects')
+    exams = db.relationship('Exam', back_populates='subject', lazy=True,
+                            cascade='all, delete-orphan', passive_deletes=True)
+
+    # Subjects are listed per class, by name
+    __table_args__ = (
+        db.Index('ix_subjects_class_name', 'class_id', 'name'),
+    )
 
     def __repr__(self):
         return f'<Subject {self.name} - {self.school_class.name}>'
@@ -92,25 +150,87 @@ class Exam(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subjects.id', ondelete='CASCADE'), nullable=False)
     class_id = db.Column(db.Integer, db.ForeignKey('classes.id'), nullable=False)
 
     duration_minutes = db.Column(db.Integer, nullable=False)  # Exam duration
     total_marks = db.Column(db.Integer, default=0)
     pass_mark = db.Column(db.Integer, default=40)
 
-    status = db.Column(db.String(20), default='draft')  # draft, published, closed
+    status = db.Column(db.Enum('draft', 'published', 'closed', name='exam_status'), default='draft')
 
     # Optional scheduling
     scheduled_start = db.Column(db.DateTime)
     scheduled_end = db.Column(db.DateTime)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
+    # Set in Python: it versions cached question sets and needs sub-second precision
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now(), onupdate=datetime.utcnow)
 
     # Relationships
-    questions = db.relationship('Question', backref='exam', lazy=True, cascade='all, delete-orphan', order_by='Question.order')
-    attempts = db.relationship('Attempt', backref='exam', lazy=True, cascade='all, delete-orphan')
+    subject = db.relationship('Subject', back_populates='exams')
+    school_class = db.relationship('SchoolClass', back_populates='exams')
+    questions = db.relationship('Question', back_populates='exam', lazy=True, cascade='all, delete-orphan',
+                                passive_deletes=True, order_by='[Question.order, Question.id]')
+    attempts = db.relationship('Attempt', back_populates='exam', lazy=True,
+                               cascade='all, delete-orphan', passive_deletes=True)
+
+    # Students only ever see the published exams of their own class, newest
+    # first; the admin list is ordered by created_at alone
+    __table_args__ = (
+        db.Index('ix_exams_class_status', 'class_id', 'status', 'created_at'),
+        db.Index('ix_exams_created_at', 'created_at'),
+    )
+
+    @classmethod
+    def list_for_class(cls, class_id):
+        """Published exams of a class, newest first, as cached snapshots.
+
+        The key carries the class's latest exam update and exam count, so any
+        edit, status change, question change or delete moves to a new entry.
+        """
+        latest, count = db.session.execute(
+            db.select(db.func.max(cls.updated_at), db.func.count(cls.id)).where(cls.class_id == class_id)
+        ).one()
+        key = f'exams:class:{class_id}:{latest.isoformat() if latest else ""}:{count}'
+
+        exams = cache.get(key)
+        if exams is None:
+            rows = db.session.execute(
+                db.select(cls, Subject.name).join(cls.subject)
+                .where(cls.class_id == class_id, cls.status == 'published')
+                .order_by(cls.created_at.desc())
+            ).all()
+            exams = [_snapshot(exam, subject=SimpleNamespace(name=subject_name)) for exam, subject_name in rows]
+            cache.set(key, exams)
+        return exams
+
+    def cached_questions(self):
+        """This exam's questions in display order, as cached snapshots.
+
+        Keyed on updated_at, which every question change bumps. Correct
+        answers are left out since the snapshots are only used for display.
+        """
+        key = f'exam:{self.id}:questions:{self.updated_at.isoformat() if self.updated_at else ""}'
+
+        questions = cache.get(key)
+        if questions is None:
+            questions = [
+                _snapshot(question, exclude=('correct_answer',))
+                for question in Question.query.filter_by(exam_id=self.id).order_by(Question.order, Question.id)
+            ]
+            cache.set(key, questions)
+        return questions
+
+    @staticmethod
+    def questions_changed(connection, exam_id, marks_delta=0):
+        """Bump an exam's updated_at and add marks_delta to its total_marks in place"""
+        connection.execute(
+            db.update(Exam.__table__)
+            .where(Exam.__table__.c.id == exam_id)
+            .values(total_marks=db.func.coalesce(Exam.__table__.c.total_marks, 0) + marks_delta,
+                    updated_at=datetime.utcnow())
+        )
 
     def __repr__(self):
         return f'<Exam {self.title}>'
@@ -121,9 +241,9 @@ class Question(db.Model):
     __tablename__ = 'questions'
 
     id = db.Column(db.Integer, primary_key=True)
-    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id'), nullable=False)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id', ondelete='CASCADE'), nullable=False)
     question_text = db.Column(db.Text, nullable=False)
-    question_type = db.Column(db.String(20), nullable=False)  # mcq or true_false
+    question_type = db.Column(db.Enum('mcq', 'true_false', name='question_type'), nullable=False)
     marks = db.Column(db.Integer, default=1)
     order = db.Column(db.Integer, default=0)
 
@@ -136,52 +256,122 @@ class Question(db.Model):
     # Correct answer: For MCQ: 'A', 'B', 'C', 'D'; For True/False: 'True' or 'False'
     correct_answer = db.Column(db.String(10), nullable=False)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
 
     # Relationships
-    answers = db.relationship('Answer', backref='question', lazy=True)
+    exam = db.relationship('Exam', back_populates='questions')
+    answers = db.relationship('Answer', back_populates='question', lazy=True)
+
+    # Questions are always listed per exam in display order, id breaking ties,
+    # so the index hands rows back already sorted
+    __table_args__ = (
+        db.Index('ix_questions_exam_order', 'exam_id', 'order', 'id'),
+    )
+
+    @classmethod
+    def bulk_create(cls, exam_id, questions, start_order=1):
+        """Insert parsed question dicts for an exam in one executemany"""
+        rows = []
+        for idx, q_data in enumerate(questions):
+            is_mcq = q_data['question_type'] == 'mcq'
+            rows.append({
+                'exam_id': exam_id,
+                'question_text': q_data['question_text'],
+                'question_type': q_data['question_type'],
+                'marks': q_data.get('marks', 1),
+                'correct_answer': q_data.get('correct_answer', ''),
+                'order': start_order + idx,
+                'option_a': q_data.get('option_a') if is_mcq else None,
+                'option_b': q_data.get('option_b') if is_mcq else None,
+                'option_c': q_data.get('option_c') if is_mcq else None,
+                'option_d': q_data.get('option_d') if is_mcq else None,
+            })
+
+        if rows:
+            db.session.execute(db.insert(cls), rows)
+            # Core inserts skip the mapper events below, so update the exam here
+            Exam.questions_changed(db.session, exam_id, sum(row['marks'] or 0 for row in rows))
+        return len(rows)
 
     def __repr__(self):
         return f'<Question {self.id} - {self.question_type}>'
 
 
+# Keep Exam.total_marks in step with its questions so nothing has to SUM them,
+# and bump Exam.updated_at so cached question sets are replaced
+@event.listens_for(Question, 'after_insert')
+def _question_inserted(mapper, connection, target):
+    Exam.questions_changed(connection, target.exam_id, target.marks or 0)
+
+
+@event.listens_for(Question, 'after_update')
+def _question_updated(mapper, connection, target):
+    history = get_history(target, 'marks')
+    delta = 0
+    if history.has_changes():
+        old = history.deleted[0] if history.deleted else 0
+        delta = (target.marks or 0) - (old or 0)
+    Exam.questions_changed(connection, target.exam_id, delta)
+
+
+@event.listens_for(Question, 'after_delete')
+def _question_deleted(mapper, connection, target):
+    Exam.questions_changed(connection, target.exam_id, -(target.marks or 0))
+
+
 class Attempt(db.Model):
     """Attempt model - one attempt per student per exam"""
     __tablename__ = 'attempts'
 
     id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('students.id'), nullable=False)
-    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id'), nullable=False)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), nullable=False)
+    exam_id = db.Column(db.Integer, db.ForeignKey('exams.id', ondelete='CASCADE'), nullable=False)
 
-    status = db.Column(db.String(20), default='in_progress')  # in_progress or submitted
+    status = db.Column(db.Enum('in_progress', 'submitted', name='attempt_status'), default='in_progress')
 
-    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
     submitted_at = db.Column(db.DateTime)
 
     total_score = db.Column(db.Float, default=0.0)
     percentage = db.Column(db.Float, default=0.0)
-    grade = db.Column(db.String(5))  # A, B, C, D, F
+    grade = db.Column(db.String(1))  # A, B, C, D, F
 
     # Relationships
-    answers = db.relationship('Answer', backref='attempt', lazy=True, cascade='all, delete-orphan')
+    student = db.relationship('Student', back_populates='attempts')
+    exam = db.relationship('Exam', back_populates='attempts')
+    answers = db.relationship('Answer', back_populates='attempt', lazy=True,
+                              cascade='all, delete-orphan', passive_deletes=True)
 
     # Unique constraint - one attempt per student per exam
+    # (its index also serves student_id lookups); the admin attempt list
+    # filters by exam and sorts by submission time straight off the index
     __table_args__ = (
         db.UniqueConstraint('student_id', 'exam_id', name='unique_student_exam_attempt'),
+        db.Index('ix_attempts_exam_submitted', 'exam_id', 'submitted_at'),
     )
 
     def calculate_grade(self):
         """Calculate grade based on percentage"""
-        if self.percentage >= 75:
-            self.grade = 'A'
-        elif self.percentage >= 60:
-            self.grade = 'B'
-        elif self.percentage >= 50:
-            self.grade = 'C'
-        elif self.percentage >= 40:
-            self.grade = 'D'
-        else:
-            self.grade = 'F'
+        self.grade = _GRADES[bisect_right(_GRADE_THRESHOLDS, self.percentage)]
+
+    def auto_grade(self):
+        """Grade all answers, then set total score, percentage and grade.
+
+        Answers are graded in one UPDATE and both totals come back from one
+        SELECT, so the cost doesn't grow with the number of questions.
+        """
+        Answer.grade_attempt(self.id, self.exam_id)
+
+        total_score, total_marks = db.session.execute(db.select(
+            db.select(db.func.coalesce(db.func.sum(Answer.marks_obtained), 0))
+            .where(Answer.attempt_id == self.id).scalar_subquery(),
+            db.select(db.func.coalesce(Exam.total_marks, 0))
+            .where(Exam.id == self.exam_id).scalar_subquery(),
+        )).one()
+
+        self.total_score = total_score
+        self.percentage = (total_score / total_marks) * 100 if total_marks > 0 else 0
+        self.calculate_grade()
 
     def __repr__(self):
         return f'<Attempt {self.id} - Student {self.student_id} - Exam {self.exam_id}>'
@@ -192,14 +382,53 @@ class Answer(db.Model):
     __tablename__ = 'answers'
 
     id = db.Column(db.Integer, primary_key=True)
-    attempt_id = db.Column(db.Integer, db.ForeignKey('attempts.id'), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
+    attempt_id = db.Column(db.Integer, db.ForeignKey('attempts.id', ondelete='CASCADE'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False, index=True)
 
     answer_text = db.Column(db.String(10))  # 'A', 'B', 'C', 'D', 'True', or 'False'
     is_correct = db.Column(db.Boolean, default=False)
     marks_obtained = db.Column(db.Float, default=0.0)
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, server_default=db.func.now())
+
+    # Relationships
+    attempt = db.relationship('Attempt', back_populates='answers')
+    question = db.relationship('Question', back_populates='answers')
+
+    # Answers are looked up per attempt, and per (attempt, question) when saving;
+    # carrying marks_obtained lets the score SUM run off the index alone
+    __table_args__ = (
+        db.Index('ix_answers_attempt_covering', 'attempt_id', 'question_id', 'marks_obtained'),
+    )
+
+    @classmethod
+    def grade_attempt(cls, attempt_id, exam_id):
+        """Grade every answer of an attempt with a single UPDATE.
+
+        An answer is correct when it matches its question's correct answer
+        case-insensitively, and then earns the question's marks. Blank answers
+        (the rows submit_exam adds for unanswered questions) never score, even
+        against a question whose correct answer was left empty, and neither do
+        answers to questions outside the attempt's exam.
+        """
+        question = db.select(Question).where(Question.id == cls.question_id, Question.exam_id == exam_id)
+        correct_answer = question.with_only_columns(Question.correct_answer).scalar_subquery()
+        question_marks = question.with_only_columns(Question.marks).scalar_subquery()
+        is_correct = db.and_(
+            cls.answer_text.is_not(None),
+            cls.answer_text != '',
+            db.func.lower(cls.answer_text) == db.func.lower(correct_answer),
+        )
+
+        db.session.execute(
+            db.update(cls)
+            .where(cls.attempt_id == attempt_id)
+            .values(
+                is_correct=db.func.coalesce(is_correct, False),
+                marks_obtained=db.case((is_correct, question_marks), else_=0),
+            )
+            .execution_options(synchronize_session=False)
+        )
 
     def __repr__(self):
         return f'<Answer {self.id} - Question {self.question_id}>'
@@ -1,60 +1,134 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
-from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.orm import contains_eager, defer, joinedload, load_only, selectinload
+from extensions import cache
 from models import db, User, Student, SchoolClass, Subject, Exam, Question, Attempt, Answer
 from forms import SchoolClassForm, SubjectForm, StudentUploadForm, ExamForm, QuestionForm, QuestionUploadForm, EmptyForm
-from utils import parse_excel_students, parse_questions_from_word, parse_questions_from_pdf
-import os
+from utils import parse_excel_students, parse_questions_file, sql_budget
+import io
 from werkzeug.utils import secure_filename
 from datetime import datetime
 
 admin_bp = Blueprint('admin', __name__)
 
+# Dashboard figures change at human pace, so they are kept briefly and
+# dropped whenever a student, class or subject changes.
+DASHBOARD_CACHE_KEY = 'admin:dashboard'
+DASHBOARD_CACHE_TTL = 30
 
-def admin_required(f):
-    """Decorator to require admin role"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if not current_user.is_authenticated or current_user.role != 'admin':
-            flash('Access denied. Admin privileges required.', 'danger')
-            return redirect(url_for('auth.login'))
-        return f(*args, **kwargs)
-    return decorated_function
+# Rows per page on the student, subject, exam and attempt listings
+PAGE_SIZE = 50
 
 
-@admin_bp.route('/dashboard')
+@admin_bp.before_request
 @login_required
-@admin_required
-def dashboard():
-    """Admin dashboard with system statistics"""
-    total_students = Student.query.count()
-    total_classes = SchoolClass.query.count()
-    total_subjects = Subject.query.count()
+def require_admin():
+    """Guard every admin view: a logged-in admin is required"""
+    if current_user.role != 'admin':
+        flash('Access denied. Admin privileges required.', 'danger')
+        return redirect(url_for('auth.login'))
+
+
+def _dashboard_stats():
+    """Totals and the most recent classes, from the cache when fresh"""
+    stats = cache.get(DASHBOARD_CACHE_KEY)
+    if stats is None:
+        # All totals in one round trip
+        total_students, total_classes, total_subjects = db.session.execute(db.select(
+            *(db.select(db.func.count()).select_from(model).scalar_subquery()
+              for model in (Student, SchoolClass, Subject))
+        )).one()
+
+        # Recent classes with their student counts
+        student_count = (db.select(db.func.count(Student.id))
+                         .where(Student.class_id == SchoolClass.id).scalar_subquery())
+        classes = [dict(row) for row in db.session.execute(
+            db.select(SchoolClass.name, SchoolClass.level, student_count.label('student_count'))
+            .order_by(SchoolClass.id.desc()).limit(6)
+        ).mappings()]
+
+        stats = {
+            'total_students': total_students,
+            'total_classes': total_classes,
+            'total_subjects': total_subjects,
+            'classes': classes
+        }
+        cache.set(DASHBOARD_CACHE_KEY, stats, timeout=DASHBOARD_CACHE_TTL)
+    return stats
+
+
+def clear_dashboard_cache(*args):
+    """Drop cached dashboard stats (also used as a mapper event listener)"""
+    cache.delete(DASHBOARD_CACHE_KEY)
+
+
+for _model in (Student, SchoolClass, Subject):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, clear_dashboard_cache)
 
-    # Get recent classes for display
-    classes = SchoolClass.query.order_by(SchoolClass.id.desc()).limit(6).all()
 
-    return render_template('admin/dashboard.html',
-                         total_students=total_students,
-                         total_classes=total_classes,
-                         total_subjects=total_subjects,
-                         classes=classes)
+@admin_bp.route('/dashboard')
+def dashboard():
+    """Admin dashboard with system statistics"""
+    return render_template('admin/dashboard.html', **_dashboard_stats())
 
 
 # ========== CLASS MANAGEMENT ==========
 
 @admin_bp.route('/classes')
-@login_required
-@admin_required
+@sql_budget(2)
 def classes():
     """List all classes"""
-    all_classes = SchoolClass.query.order_by(SchoolClass.name).all()
-    return render_template('admin/classes.html', classes=all_classes)
+    # Count students and subjects in SQL rather than loading both
+    # collections for every card just to take their length.
+    student_count = (db.select(db.func.count(Student.id))
+                     .where(Student.class_id == SchoolClass.id).scalar_subquery())
+    subject_count = (db.select(db.func.count(Subject.id))
+                     .where(Subject.class_id == SchoolClass.id).scalar_subquery())
+    rows = db.session.execute(
+        db.select(SchoolClass, student_count, subject_count)
+        .options(load_only(SchoolClass.id, SchoolClass.name, SchoolClass.level, SchoolClass.created_at))
+        .order_by(SchoolClass.name)
+    ).all()
+    all_classes = [school_class for school_class, _, _ in rows]
+    student_counts = {school_class.id: n for school_class, n, _ in rows}
+    subject_counts = {school_class.id: n for school_class, _, n in rows}
+    return render_template('admin/classes.html', classes=all_classes,
+                           student_counts=student_counts, subject_counts=subject_counts)
+
+
+@admin_bp.route('/classes/<int:class_id>', methods=['GET', 'POST'])
+@sql_budget(10)  # 6 to view; saving the edit form adds 4
+def class_detail(class_id):
+    """View a class with its students, subjects and average scores"""
+    # Students, their users, subjects and exams come back in a fixed
+    # number of batched queries however large the class is
+    school_class = SchoolClass.query.options(
+        selectinload(SchoolClass.students).joinedload(Student.user),
+        selectinload(SchoolClass.subjects).selectinload(Subject.exams).load_only(Exam.id, Exam.subject_id)
+    ).get_or_404(class_id)
+    form = SchoolClassForm(obj=school_class)
+
+    if form.validate_on_submit():
+        school_class.name = form.name.data
+        school_class.level = form.level.data
+        db.session.commit()
+        flash(f'Class "{school_class.name}" updated successfully!', 'success')
+        return redirect(url_for('admin.class_detail', class_id=class_id))
+
+    # Averages are aggregated in SQL rather than by walking attempts
+    averages = dict(db.session.execute(
+        db.select(Attempt.student_id, db.func.avg(Attempt.percentage))
+        .join(Attempt.student)
+        .where(Student.class_id == class_id, Attempt.status == 'submitted')
+        .group_by(Attempt.student_id)
+    ).all())
+
+    return render_template('admin/class_detail.html', form=form, school_class=school_class, averages=averages)
 
 
 @admin_bp.route('/classes/create', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def create_class():
     """Create a new class"""
     form = SchoolClassForm()
@@ -72,8 +146,6 @@ def create_class():
 
 
 @admin_bp.route('/classes/<int:class_id>/edit', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def edit_class(class_id):
     """Edit a class"""
     school_class = SchoolClass.query.get_or_404(class_id)
@@ -90,14 +162,12 @@ def edit_class(class_id):
 
 
 @admin_bp.route('/classes/<int:class_id>/delete', methods=['POST'])
-@login_required
-@admin_required
 def delete_class(class_id):
     """Delete a class"""
     school_class = SchoolClass.query.get_or_404(class_id)
 
-    # Check if class has students
-    if school_class.students:
+    # Check if class has students (EXISTS, without loading them)
+    if db.session.query(db.exists().where(Student.class_id == class_id)).scalar():
         flash(f'Cannot delete class "{school_class.name}" because it has students assigned.', 'danger')
         return redirect(url_for('admin.classes'))
 
@@ -110,17 +180,25 @@ def delete_class(class_id):
 # ========== SUBJECT MANAGEMENT ==========
 
 @admin_bp.route('/subjects')
-@login_required
-@admin_required
+@sql_budget(4)
 def subjects():
     """List all subjects"""
-    all_subjects = Subject.query.join(SchoolClass).order_by(SchoolClass.name, Subject.name).all()
-    return render_template('admin/subjects.html', subjects=all_subjects)
+    pagination = (Subject.query.join(SchoolClass)
+                  .options(load_only(Subject.id, Subject.name, Subject.code, Subject.class_id),
+                           contains_eager(Subject.school_class)
+                           .load_only(SchoolClass.id, SchoolClass.name, SchoolClass.level))
+                  .order_by(SchoolClass.name, Subject.name, Subject.id)
+                  .paginate(page=request.args.get('page', 1, type=int), per_page=PAGE_SIZE, error_out=False))
+    exam_counts = dict(db.session.execute(
+        db.select(Exam.subject_id, db.func.count(Exam.id))
+        .where(Exam.subject_id.in_([subject.id for subject in pagination.items]))
+        .group_by(Exam.subject_id)
+    ).all())
+    return render_template('admin/subjects.html', subjects=pagination.items,
+                           pagination=pagination, exam_counts=exam_counts)
 
 
 @admin_bp.route('/subjects/create', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def create_subject():
     """Create a new subject"""
     form = SubjectForm()
@@ -139,8 +217,6 @@ def create_subject():
 
 
 @admin_bp.route('/subjects/<int:subject_id>/edit', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def edit_subject(subject_id):
     """Edit a subject"""
     subject = Subject.query.get_or_404(subject_id)
@@ -158,14 +234,12 @@ def edit_subject(subject_id):
 
 
 @admin_bp.route('/subjects/<int:subject_id>/delete', methods=['POST'])
-@login_required
-@admin_required
 def delete_subject(subject_id):
     """Delete a subject"""
     subject = Subject.query.get_or_404(subject_id)
 
-    # Check if subject has exams
-    if subject.exams:
+    # Check if subject has exams (EXISTS, without loading them)
+    if db.session.query(db.exists().where(Exam.subject_id == subject_id)).scalar():
         flash(f'Cannot delete subject "{subject.name}" because it has exams assigned.', 'danger')
         return redirect(url_for('admin.subjects'))
 
@@ -178,36 +252,75 @@ def delete_subject(subject_id):
 # ========== STUDENT MANAGEMENT ==========
 
 @admin_bp.route('/students')
-@login_required
-@admin_required
+@sql_budget(4)
 def students():
-    """List all students"""
-    all_students = Student.query.join(SchoolClass).order_by(SchoolClass.name, Student.last_name).all()
-    return render_template('admin/students.html', students=all_students)
+    """List all students, optionally filtered by ?q= on name or student ID"""
+    # Only the columns the table shows; in particular the password hash stays behind
+    query = Student.query.join(Student.school_class).options(
+        contains_eager(Student.school_class).load_only(SchoolClass.id, SchoolClass.name, SchoolClass.level),
+        joinedload(Student.user).load_only(User.id, User.email, User.is_active)
+    )
+
+    search = request.args.get('q', '').strip()
+    if search:
+        pattern = f'%{search}%'
+        query = query.filter(db.or_(Student.full_name.ilike(pattern), Student.student_id.ilike(pattern)))
+
+    pagination = query.order_by(SchoolClass.name, Student.last_name, Student.id).paginate(
+        page=request.args.get('page', 1, type=int), per_page=PAGE_SIZE, error_out=False)
+
+    # Attempt counts for this page in one GROUP BY instead of loading each student's attempts
+    attempt_counts = dict(db.session.execute(
+        db.select(Attempt.student_id, db.func.count(Attempt.id))
+        .where(Attempt.student_id.in_([student.id for student in pagination.items]))
+        .group_by(Attempt.student_id)
+    ).all())
+
+    return render_template('admin/students.html', students=pagination.items, search=search,
+                           pagination=pagination, attempt_counts=attempt_counts)
+
+
+@admin_bp.route('/students/<int:student_id>')
+@sql_budget(3)
+def student_detail(student_id):
+    """View a student's profile and exam attempts"""
+    student = Student.query.options(
+        joinedload(Student.user),
+        joinedload(Student.school_class),
+        selectinload(Student.attempts).joinedload(Attempt.exam).joinedload(Exam.subject)
+    ).get_or_404(student_id)
+    return render_template('admin/student_detail.html', student=student)
+
+
+@admin_bp.route('/students/<int:student_id>/toggle-status', methods=['POST'])
+def toggle_student_status(student_id):
+    """Activate or deactivate a student's account"""
+    student = Student.query.options(joinedload(Student.user)).get_or_404(student_id)
+    student.user.is_active = not student.user.is_active
+    db.session.commit()
+
+    status = 'activated' if student.user.is_active else 'deactivated'
+    flash(f'Student "{student.full_name}" {status}.', 'success')
+    return redirect(url_for('admin.student_detail', student_id=student_id))
 
 
 @admin_bp.route('/students/upload', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def upload_students():
     """Bulk upload students from Excel"""
     form = StudentUploadForm()
     if form.validate_on_submit():
-        file = form.excel_file.data
-        filename = secure_filename(file.filename)
-        filepath = os.path.join('instance', filename)
-        file.save(filepath)
-
-        result = parse_excel_students(filepath, form.class_id.data)
-
-        # Clean up file
-        os.remove(filepath)
+        # Parsed from memory (uploads are capped by MAX_CONTENT_LENGTH), no
+        # save-then-delete round trip through instance/
+        result = parse_excel_students(io.BytesIO(form.excel_file.data.read()), form.class_id.data)
 
         if result['success']:
+            clear_dashboard_cache()  # Bulk inserts bypass the mapper events
             flash(f'Successfully uploaded {result["created"]} students!', 'success')
             if result['errors']:
-                for error in result['errors'][:5]:  # Show first 5 errors
-                    flash(error, 'warning')
+                # One warning for the lot keeps the session cookie small
+                errors = result['errors']
+                more = f' (and {len(errors) - 5} more)' if len(errors) > 5 else ''
+                flash(f'{len(errors)} rows skipped: ' + '; '.join(errors[:5]) + more, 'warning')
             return redirect(url_for('admin.students'))
         else:
             flash(f'Error: {result["message"]}', 'danger')
@@ -216,35 +329,37 @@ def upload_students():
 
 
 @admin_bp.route('/students/<int:student_id>/delete', methods=['POST'])
-@login_required
-@admin_required
 def delete_student(student_id):
     """Delete a student"""
     student = Student.query.get_or_404(student_id)
-    user = student.user
+    full_name = student.full_name
 
-    db.session.delete(student)
-    db.session.delete(user)
+    # One DELETE on users; ON DELETE CASCADE removes the profile, attempts and answers
+    # (older databases get the cascades from migration 3c1f0a9d2b7e)
+    db.session.execute(db.delete(User).where(User.id == student.user_id))
     db.session.commit()
+    clear_dashboard_cache()  # Core deletes bypass the mapper events
 
-    flash(f'Student "{student.full_name}" deleted successfully!', 'success')
+    flash(f'Student "{full_name}" deleted successfully!', 'success')
     return redirect(url_for('admin.students'))
 
 
 # ========== EXAM MANAGEMENT ==========
 
 @admin_bp.route('/exams')
-@login_required
-@admin_required
+@sql_budget(3)
 def exams():
     """List all exams"""
-    all_exams = Exam.query.order_by(Exam.created_at.desc()).all()
-    return render_template('admin/exams.html', exams=all_exams)
+    # Each row shows its subject and class; load them in the same SELECT,
+    # leaving out the free-text description the list never shows
+    pagination = Exam.query.options(
+        defer(Exam.description), joinedload(Exam.subject), joinedload(Exam.school_class)
+    ).order_by(Exam.created_at.desc(), Exam.id.desc()).paginate(
+        page=request.args.get('page', 1, type=int), per_page=PAGE_SIZE, error_out=False)
+    return render_template('admin/exams.html', exams=pagination.items, pagination=pagination)
 
 
 @admin_bp.route('/exams/create', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def create_exam():
     """Create a new exam"""
     form = ExamForm()
@@ -269,24 +384,19 @@ def create_exam():
 
 
 @admin_bp.route('/exams/<int:exam_id>')
-@login_required
-@admin_required
+@sql_budget(3)
 def exam_details(exam_id):
     """View exam details and questions"""
-    exam = Exam.query.get_or_404(exam_id)
-    questions = Question.query.filter_by(exam_id=exam_id).order_by(Question.order).all()
-
-    # Calculate total marks
-    total_marks = sum(q.marks for q in questions)
-    exam.total_marks = total_marks
-    db.session.commit()
+    # Subject and class come with the exam; the questions follow in one
+    # batched SELECT, already in order through the relationship's order_by
+    exam = Exam.query.options(
+        joinedload(Exam.subject), joinedload(Exam.school_class), selectinload(Exam.questions)
+    ).get_or_404(exam_id)
 
-    return render_template('admin/exam_details.html', exam=exam, questions=questions)
+    return render_template('admin/exam_details.html', exam=exam, questions=exam.questions)
 
 
 @admin_bp.route('/exams/<int:exam_id>/edit', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def edit_exam(exam_id):
     """Edit an exam"""
     exam = Exam.query.get_or_404(exam_id)
@@ -309,8 +419,6 @@ def edit_exam(exam_id):
 
 
 @admin_bp.route('/exams/<int:exam_id>/delete', methods=['POST'])
-@login_required
-@admin_required
 def delete_exam(exam_id):
     """Delete an exam"""
     exam = Exam.query.get_or_404(exam_id)
@@ -322,64 +430,69 @@ def delete_exam(exam_id):
 
 
 @admin_bp.route('/exams/<int:exam_id>/publish', methods=['POST'])
-@login_required
-@admin_required
 def publish_exam(exam_id):
     """Publish an exam"""
-    exam = Exam.query.get_or_404(exam_id)
-
-    if not exam.questions:
+    # One UPDATE that only matches an exam with questions; the follow-up
+    # lookup is needed only to tell a missing exam from an empty one
+    title = db.session.execute(
+        db.update(Exam)
+        .where(Exam.id == exam_id, db.exists().where(Question.exam_id == exam_id))
+        .values(status='published')
+        .returning(Exam.title)
+    ).scalar()
+
+    if title is None:
+        db.get_or_404(Exam, exam_id)
         flash('Cannot publish exam without questions!', 'danger')
-        return redirect(url_for('admin.exam_details', exam_id=exam.id))
+        return redirect(url_for('admin.exam_details', exam_id=exam_id))
 
-    exam.status = 'published'
     db.session.commit()
-    flash(f'Exam "{exam.title}" published successfully!', 'success')
-    return redirect(url_for('admin.exam_details', exam_id=exam.id))
+    flash(f'Exam "{title}" published successfully!', 'success')
+    return redirect(url_for('admin.exam_details', exam_id=exam_id))
 
 
 @admin_bp.route('/exams/<int:exam_id>/close', methods=['POST'])
-@login_required
-@admin_required
 def close_exam(exam_id):
     """Close an exam"""
-    exam = Exam.query.get_or_404(exam_id)
-    exam.status = 'closed'
+    title = db.first_or_404(
+        db.update(Exam).where(Exam.id == exam_id).values(status='closed').returning(Exam.title)
+    )
     db.session.commit()
-    flash(f'Exam "{exam.title}" closed successfully!', 'success')
-    return redirect(url_for('admin.exam_details', exam_id=exam.id))
+    flash(f'Exam "{title}" closed successfully!', 'success')
+    return redirect(url_for('admin.exam_details', exam_id=exam_id))
 
 
 # ========== QUESTION MANAGEMENT ==========
 
 @admin_bp.route('/exams/<int:exam_id>/questions/add', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def add_question(exam_id):
     """Add a question to an exam"""
     exam = Exam.query.get_or_404(exam_id)
     form = QuestionForm()
 
     if form.validate_on_submit():
-        # Get the highest order number
-        max_order = db.session.query(db.func.max(Question.order)).filter_by(exam_id=exam_id).scalar() or 0
+        # The next order number is worked out inside the INSERT itself, so
+        # there is no separate MAX() round-trip to race against
+        next_order = (db.select(db.func.coalesce(db.func.max(Question.order), 0) + 1)
+                      .where(Question.exam_id == exam_id).scalar_subquery())
 
-        question = Question(
+        values = dict(
             exam_id=exam_id,
             question_text=form.question_text.data,
             question_type=form.question_type.data,
             marks=form.marks.data,
             correct_answer=form.correct_answer.data,
-            order=max_order + 1
+            order=next_order
         )
 
         if form.question_type.data == 'mcq':
-            question.option_a = form.option_a.data
-            question.option_b = form.option_b.data
-            question.option_c = form.option_c.data
-            question.option_d = form.option_d.data
+            values.update(option_a=form.option_a.data, option_b=form.option_b.data,
+                          option_c=form.option_c.data, option_d=form.option_d.data)
 
-        db.session.add(question)
+        # A single Core INSERT; like bulk_create it skips the mapper events,
+        # so the exam's totals are updated here
+        db.session.execute(db.insert(Question).values(**values))
+        Exam.questions_changed(db.session, exam_id, form.marks.data or 0)
         db.session.commit()
         flash('Question added successfully!', 'success')
         return redirect(url_for('admin.exam_details', exam_id=exam_id))
@@ -388,8 +501,6 @@ def add_question(exam_id):
 
 
 @admin_bp.route('/exams/<int:exam_id>/questions/upload', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def upload_questions(exam_id):
     """Bulk upload questions from Word/PDF"""
     exam = Exam.query.get_or_404(exam_id)
@@ -397,45 +508,16 @@ def upload_questions(exam_id):
 
     if form.validate_on_submit():
         file = form.file.data
-        filename = secure_filename(file.filename)
-        filepath = os.path.join('instance', filename)
-        file.save(filepath)
-
-        # Parse based on file type
-        if filename.endswith('.docx'):
-            result = parse_questions_from_word(filepath)
-        elif filename.endswith('.pdf'):
-            result = parse_questions_from_pdf(filepath)
-        else:
-            flash('Invalid file type!', 'danger')
-            os.remove(filepath)
-            return redirect(url_for('admin.upload_questions', exam_id=exam_id))
 
-        # Clean up file
-        os.remove(filepath)
+        # Parsed from memory rather than a shared path under instance/ that
+        # concurrent uploads of the same name would clobber
+        result = parse_questions_file(secure_filename(file.filename), file.read())
 
         if result['success']:
             # Get the highest order number
             max_order = db.session.query(db.func.max(Question.order)).filter_by(exam_id=exam_id).scalar() or 0
 
-            for idx, q_data in enumerate(result['questions']):
-                question = Question(
-                    exam_id=exam_id,
-                    question_text=q_data['question_text'],
-                    question_type=q_data['question_type'],
-                    marks=q_data.get('marks', 1),
-                    correct_answer=q_data.get('correct_answer', ''),
-                    order=max_order + idx + 1
-                )
-
-                if q_data['question_type'] == 'mcq':
-                    question.option_a = q_data.get('option_a')
-                    question.option_b = q_data.get('option_b')
-                    question.option_c = q_data.get('option_c')
-                    question.option_d = q_data.get('option_d')
-
-                db.session.add(question)
-
+            Question.bulk_create(exam_id, result['questions'], start_order=max_order + 1)
             db.session.commit()
             flash(f'Successfully uploaded {len(result["questions"])} questions!', 'success')
             return redirect(url_for('admin.exam_details', exam_id=exam_id))
@@ -446,8 +528,6 @@ def upload_questions(exam_id):
 
 
 @admin_bp.route('/questions/<int:question_id>/edit', methods=['GET', 'POST'])
-@login_required
-@admin_required
 def edit_question(question_id):
     """Edit a question"""
     question = Question.query.get_or_404(question_id)
@@ -473,8 +553,6 @@ def edit_question(question_id):
 
 
 @admin_bp.route('/questions/<int:question_id>/delete', methods=['POST'])
-@login_required
-@admin_required
 def delete_question(question_id):
     """Delete a question"""
     question = Question.query.get_or_404(question_id)
@@ -489,22 +567,42 @@ def delete_question(question_id):
 # ========== ATTEMPTS AND RESULTS ==========
 
 @admin_bp.route('/exams/<int:exam_id>/attempts')
-@login_required
-@admin_required
+@sql_budget(4)
 def exam_attempts(exam_id):
     """View all attempts for an exam"""
     exam = Exam.query.get_or_404(exam_id)
-    attempts = Attempt.query.filter_by(exam_id=exam_id).order_by(Attempt.submitted_at.desc()).all()
+    # Each row shows the student's name and email
+    pagination = (Attempt.query.filter_by(exam_id=exam_id)
+                  .options(joinedload(Attempt.student).joinedload(Student.user).load_only(User.id, User.email))
+                  .order_by(Attempt.submitted_at.desc(), Attempt.id.desc())
+                  .paginate(page=request.args.get('page', 1, type=int), per_page=PAGE_SIZE, error_out=False))
 
-    return render_template('admin/exam_attempts.html', exam=exam, attempts=attempts)
+    return render_template('admin/exam_attempts.html', exam=exam, attempts=pagination.items,
+                           pagination=pagination)
 
 
 @admin_bp.route('/attempts/<int:attempt_id>')
-@login_required
-@admin_required
+@sql_budget(3)
 def view_attempt(attempt_id):
     """View a specific attempt in detail"""
-    attempt = Attempt.query.get_or_404(attempt_id)
-    answers = Answer.query.filter_by(attempt_id=attempt_id).join(Question).order_by(Question.order).all()
+    # The page heads with the student and exam, so fetch them with the attempt
+    attempt = Attempt.query.options(
+        joinedload(Attempt.student).joinedload(Student.user), joinedload(Attempt.exam)
+    ).get_or_404(attempt_id)
+    answers = (Answer.query.filter_by(attempt_id=attempt_id).join(Answer.question)
+               .options(contains_eager(Answer.question))
+               .order_by(Question.order, Question.id).all())
 
     return render_template('admin/view_attempt.html', attempt=attempt, answers=answers)
+
+
+# ========== SYSTEM ==========
+
+@admin_bp.route('/health')
+def health():
+    """Report database connectivity and connection pool usage"""
+    db.session.execute(db.text('SELECT 1'))
+    return jsonify({
+        'database': 'ok',
+        'pool': db.engine.pool.status()
+    })
@@ -1,20 +1,31 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from functools import lru_cache
+from flask import Blueprint, current_app, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, current_user
+from sqlalchemy.orm import load_only
+from werkzeug.security import check_password_hash, generate_password_hash
 from models import db, User
 from forms import LoginForm
 
 auth_bp = Blueprint('auth', __name__)
 
+# Landing endpoint for each user role
+ROLE_DASHBOARDS = {
+    'admin': 'admin.dashboard',
+    'student': 'student.dashboard',
+}
+
+
+@lru_cache(maxsize=None)
+def _dummy_hash(method):
+    """A throwaway hash in the configured method, checked for unknown emails"""
+    return generate_password_hash('not-a-real-password', method=method)
+
 
 @auth_bp.route('/')
 def index():
     """Redirect to appropriate dashboard based on user role"""
-    if current_user.is_authenticated:
-        if current_user.role == 'admin':
-            return redirect(url_for('admin.dashboard'))
-        elif current_user.role == 'student':
-            return redirect(url_for('student.dashboard'))
-    return redirect(url_for('auth.login'))
+    dashboard = ROLE_DASHBOARDS.get(current_user.role) if current_user.is_authenticated else None
+    return redirect(url_for(dashboard or 'auth.login'))
 
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
@@ -25,7 +36,15 @@ def login():
     form = LoginForm()
     
     if form.validate_on_submit():
-        user = User.query.filter_by(email=form.email.data).first()
+        # Fetch only what authentication and the session need
+        user = User.query.options(
+            load_only(User.id, User.email, User.password_hash, User.is_active, User.role)
+        ).filter_by(email=form.email.data).first()
+
+        if user is None:
+            # Pay the same hashing cost as a real check, so response time
+            # does not reveal which emails have accounts
+            check_password_hash(_dummy_hash(current_app.config['PASSWORD_HASH_METHOD']), form.password.data)
         
         if user and user.check_password(form.password.data):
             if not user.is_active:
@@ -34,19 +53,22 @@ def login():
             
             login_user(user)
 
+            # Persist a password hash upgraded by check_password()
+            if db.session.is_modified(user):
+                db.session.commit()
+
             # Redirect to appropriate dashboard
             next_page = request.args.get('next')
             if next_page:
                 return redirect(next_page)
 
-            if user.role == 'admin':
-                return redirect(url_for('admin.dashboard'))
-            elif user.role == 'student':
-                return redirect(url_for('student.dashboard'))
-            else:
-                flash('Invalid user role.', 'danger')
-                logout_user()
-                return redirect(url_for('auth.login'))
+            dashboard = ROLE_DASHBOARDS.get(user.role)
+            if dashboard:
+                return redirect(url_for(dashboard))
+
+            flash('Invalid user role.', 'danger')
+            logout_user()
+            return redirect(url_for('auth.login'))
         else:
             flash('Invalid email or password. Please try again.', 'danger')
     
@@ -1,8 +1,9 @@
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, session
 from flask_login import login_required, current_user
 from functools import wraps
-from models import db, Student, Exam, Question, Attempt, Answer
-from utils import auto_grade_answer
+from sqlalchemy.orm import contains_eager, joinedload
+from models import db, Exam, Question, Attempt, Answer
+from utils import sql_budget
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
@@ -23,24 +24,25 @@ def student_required(f):
 @student_bp.route('/dashboard')
 @login_required
 @student_required
+@sql_budget(4)
 def dashboard():
     """Student dashboard showing available exams"""
-    student = Student.query.filter_by(user_id=current_user.id).first()
+    student = current_user.student_profile
 
     # Get all published exams for student's class
-    all_exams = Exam.query.filter_by(
-        class_id=student.class_id,
-        status='published'
-    ).order_by(Exam.created_at.desc()).all()
+    all_exams = Exam.list_for_class(student.class_id)
 
     nigeria_tz = ZoneInfo('Africa/Lagos')
     now_nigeria = datetime.now(nigeria_tz)
 
+    # Student's existing attempts, keyed by exam (one query for all exams)
+    attempts_by_exam = {a.exam_id: a for a in Attempt.query.filter_by(student_id=student.id).all()}
+
     available_exams = []
 
     for exam in all_exams:
         # Check if student has already attempted this exam
-        attempt = Attempt.query.filter_by(student_id=student.id, exam_id=exam.id).first()
+        attempt = attempts_by_exam.get(exam.id)
 
         # Check if exam is currently available (scheduling)
         is_available = True
@@ -71,9 +73,10 @@ def dashboard():
 @student_bp.route('/exams/<int:exam_id>/start', methods=['POST'])
 @login_required
 @student_required
+@sql_budget(6)
 def start_exam(exam_id):
     """Start an exam attempt"""
-    student = Student.query.filter_by(user_id=current_user.id).first()
+    student = current_user.student_profile
     exam = Exam.query.filter_by(id=exam_id, class_id=student.class_id).first_or_404()
 
     # Verify exam is published
@@ -138,17 +141,23 @@ def start_exam(exam_id):
 @student_bp.route('/attempts/<int:attempt_id>/take')
 @login_required
 @student_required
+@sql_budget(4)  # 3 once the question set is cached
 def take_exam(attempt_id):
     """Take exam interface"""
-    student = Student.query.filter_by(user_id=current_user.id).first()
-    attempt = Attempt.query.filter_by(id=attempt_id, student_id=student.id).first_or_404()
+    student = current_user.student_profile
+    # The exam and its subject are shown in the page header; the questions
+    # themselves come from the exam's cached snapshot
+    attempt = (Attempt.query.options(joinedload(Attempt.exam).joinedload(Exam.subject))
+               .filter_by(id=attempt_id, student_id=student.id).first_or_404())
 
     if attempt.status != 'in_progress':
         flash('This attempt has already been submitted.', 'warning')
         return redirect(url_for('student.view_result', attempt_id=attempt.id))
 
-    questions = Question.query.filter_by(exam_id=attempt.exam_id).order_by(Question.order).all()
-    existing_answers = {a.question_id: a.answer_text for a in Answer.query.filter_by(attempt_id=attempt.id).all()}
+    questions = attempt.exam.cached_questions()
+    existing_answers = dict(db.session.execute(
+        db.select(Answer.question_id, Answer.answer_text).filter_by(attempt_id=attempt.id)
+    ).all())
 
     # Get exam end time
     exam_end_time_str = session.get('exam_end_time')
@@ -184,9 +193,10 @@ def take_exam(attempt_id):
 @student_bp.route('/attempts/<int:attempt_id>/save-answer', methods=['POST'])
 @login_required
 @student_required
+@sql_budget(4)
 def save_answer(attempt_id):
     """Save answer via AJAX"""
-    student = Student.query.filter_by(user_id=current_user.id).first()
+    student = current_user.student_profile
     attempt = Attempt.query.filter_by(id=attempt_id, student_id=student.id).first_or_404()
 
     if attempt.status != 'in_progress':
@@ -195,7 +205,17 @@ def save_answer(attempt_id):
     question_id = request.json.get('question_id')
     answer_text = request.json.get('answer_text', '').strip()
 
-    answer = Answer.query.filter_by(attempt_id=attempt.id, question_id=question_id).first()
+    # The question must belong to the attempt's exam; its saved answer, if
+    # any, comes back from the same query
+    row = db.session.execute(
+        db.select(Question.id, Answer)
+        .outerjoin(Answer, db.and_(Answer.question_id == Question.id, Answer.attempt_id == attempt.id))
+        .where(Question.id == question_id, Question.exam_id == attempt.exam_id)
+    ).first()
+    if row is None:
+        return jsonify({'success': False, 'message': 'Question is not part of this exam'}), 400
+
+    answer = row.Answer
     if not answer:
         answer = Answer(attempt_id=attempt.id, question_id=question_id)
         db.session.add(answer)
@@ -209,51 +229,28 @@ def save_answer(attempt_id):
 @student_bp.route('/attempts/<int:attempt_id>/submit', methods=['POST'])
 @login_required
 @student_required
+@sql_budget(8)
 def submit_exam(attempt_id):
     """Submit exam and calculate score"""
-    student = Student.query.filter_by(user_id=current_user.id).first()
+    student = current_user.student_profile
     attempt = Attempt.query.filter_by(id=attempt_id, student_id=student.id).first_or_404()
 
     if attempt.status != 'in_progress':
         flash('This attempt has already been submitted.', 'warning')
         return redirect(url_for('student.view_result', attempt_id=attempt.id))
 
-    # Auto-grade all answers
-    questions = Question.query.filter_by(exam_id=attempt.exam_id).all()
-
-    for question in questions:
-        answer = Answer.query.filter_by(attempt_id=attempt.id, question_id=question.id).first()
-
-        if not answer:
-            # Create empty answer for unanswered questions
-            answer = Answer(
-                attempt_id=attempt.id,
-                question_id=question.id,
-                answer_text='',
-                is_correct=False,
-                marks_obtained=0
-            )
-            db.session.add(answer)
-        else:
-            # Auto-grade the answer
-            is_correct, marks = auto_grade_answer(question, answer.answer_text)
-            answer.is_correct = is_correct
-            answer.marks_obtained = marks
+    # Create empty answers for unanswered questions in one INSERT ... SELECT
+    answered = db.select(Answer.question_id).filter_by(attempt_id=attempt.id)
+    db.session.execute(db.insert(Answer).from_select(
+        ['attempt_id', 'question_id', 'answer_text', 'is_correct', 'marks_obtained'],
+        db.select(db.literal(attempt.id), Question.id, db.literal(''), db.false(), db.literal(0))
+        .where(Question.exam_id == attempt.exam_id, Question.id.not_in(answered))
+    ))
 
-    # Calculate total score and grade
+    # Auto-grade all answers and calculate total score and grade
     attempt.status = 'submitted'
     attempt.submitted_at = datetime.utcnow()
-
-    total_score = db.session.query(db.func.sum(Answer.marks_obtained)).filter_by(attempt_id=attempt.id).scalar() or 0
-    attempt.total_score = total_score
-
-    if attempt.exam.total_marks > 0:
-        attempt.percentage = (total_score / attempt.exam.total_marks) * 100
-    else:
-        attempt.percentage = 0
-
-    # Calculate grade
-    attempt.calculate_grade()
+    attempt.auto_grade()
 
     db.session.commit()
 
@@ -268,9 +265,10 @@ def submit_exam(attempt_id):
 @student_bp.route('/attempts/<int:attempt_id>/result')
 @login_required
 @student_required
+@sql_budget(3)
 def view_result(attempt_id):
     """View exam result"""
-    student = Student.query.filter_by(user_id=current_user.id).first()
+    student = current_user.student_profile
     attempt = Attempt.query.filter_by(id=attempt_id, student_id=student.id).first_or_404()
 
     if attempt.status != 'submitted':
@@ -278,6 +276,8 @@ def view_result(attempt_id):
         return redirect(url_for('student.dashboard'))
 
     # Get all answers with questions
-    answers = Answer.query.filter_by(attempt_id=attempt.id).join(Question).order_by(Question.order).all()
+    answers = (Answer.query.filter_by(attempt_id=attempt.id).join(Answer.question)
+               .options(contains_eager(Answer.question))
+               .order_by(Question.order, Question.id).all())
 
     return render_template('student/result.html', attempt=attempt, answers=answers)
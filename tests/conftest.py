@@ -0,0 +1,79 @@
+import pytest
+
+from app import create_app
+from models import db, User, Student, SchoolClass, Subject, Exam, Question
+
+
+@pytest.fixture
+def app():
+    """App on a fresh in-memory database, with strict SQL budgets (TestingConfig).
+
+    No app context is left pushed: requests must get their own, or the
+    per-request query log on ``g`` would carry over between them.
+    """
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+@pytest.fixture
+def school(app):
+    """An admin, one class with a subject, a published exam and one student; returns their ids"""
+    with app.app_context():
+        return _create_school()
+
+
+def _create_school():
+    admin = User(email='admin@cbt.com', role='admin')
+    admin.set_password('admin123')
+    db.session.add(admin)
+
+    school_class = SchoolClass(name='JSS 1A', level='JSS1')
+    db.session.add(school_class)
+    db.session.flush()
+
+    subject = Subject(name='Mathematics', code='MTH', class_id=school_class.id)
+    db.session.add(subject)
+    db.session.flush()
+
+    exam = Exam(title='First Term', subject_id=subject.id, class_id=school_class.id,
+                duration_minutes=30, status='published')
+    db.session.add(exam)
+    db.session.flush()
+    db.session.add_all([
+        Question(exam_id=exam.id, question_text='2 + 2 = 4', question_type='true_false',
+                 correct_answer='True', marks=2, order=1),
+        Question(exam_id=exam.id, question_text='Pick B', question_type='mcq', correct_answer='B',
+                 option_a='a', option_b='b', option_c='c', option_d='d', marks=3, order=2),
+    ])
+
+    user = User(email='student@cbt.com', role='student')
+    user.set_password('student123')
+    db.session.add(user)
+    db.session.flush()
+    student = Student(user_id=user.id, student_id='STU001', first_name='Ada', last_name='Obi',
+                      class_id=school_class.id)
+    db.session.add(student)
+    db.session.commit()
+
+    return {'class': school_class.id, 'subject': subject.id, 'exam': exam.id, 'student': student.id}
+
+
+def _login(app, email, password):
+    client = app.test_client()
+    response = client.post('/login', data={'email': email, 'password': password})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def admin_client(app, school):
+    return _login(app, 'admin@cbt.com', 'admin123')
+
+
+@pytest.fixture
+def student_client(app, school):
+    return _login(app, 'student@cbt.com', 'student123')
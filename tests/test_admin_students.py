@@ -0,0 +1,37 @@
+from models import db, User, Student
+from routes.admin import PAGE_SIZE
+
+
+def _add_students(class_id, count):
+    for i in range(count):
+        user = User(email=f'obi{i}@cbt.com', role='student', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Student(user_id=user.id, student_id=f'STU{100 + i}', first_name='Chidi',
+                               last_name=f'Obi{i:03d}', class_id=class_id))
+    db.session.commit()
+
+
+def test_search_box_submits_q(admin_client):
+    page = admin_client.get('/admin/students').get_data(as_text=True)
+    assert '<form method="get" action="/admin/students"' in page
+    assert 'name="q" value=""' in page
+    assert 'searchInput' not in page
+
+
+def test_search_without_matches_keeps_the_search_box(admin_client):
+    page = admin_client.get('/admin/students?q=Nobody').get_data(as_text=True)
+    assert 'name="q" value="Nobody"' in page
+    assert 'No students match "Nobody"' in page
+
+
+def test_search_is_kept_across_pages(app, school, admin_client):
+    with app.app_context():
+        _add_students(school['class'], PAGE_SIZE + 1)
+
+    page = admin_client.get('/admin/students?q=Obi').get_data(as_text=True)
+    assert f'Matching Students ({PAGE_SIZE + 2})' in page
+    assert '/admin/students?q=Obi&amp;page=2' in page
+
+    page = admin_client.get('/admin/students?q=Obi&page=2').get_data(as_text=True)
+    assert 'STU150' in page
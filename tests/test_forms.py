@@ -0,0 +1,33 @@
+import pytest
+
+import config
+from app import create_app
+from forms import class_choices
+from models import db
+
+
+@pytest.fixture
+def simple_cache_app(monkeypatch):
+    """App with the default per-process SimpleCache instead of TestingConfig's NullCache"""
+    monkeypatch.setitem(config.config, 'simple_cache', type('SimpleCacheConfig', (config.TestingConfig,), {
+        'CACHE_TYPE': 'SimpleCache',
+    }))
+    app = create_app('simple_cache')
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def test_class_added_by_another_worker_is_a_valid_choice(simple_cache_app):
+    with simple_cache_app.test_request_context():
+        assert class_choices() == []
+
+    # Written by a different process, so this worker's mapper events never fire
+    with simple_cache_app.app_context():
+        db.session.execute(db.text("INSERT INTO classes (name) VALUES ('JSS 3C')"))
+        db.session.commit()
+
+    with simple_cache_app.test_request_context():
+        assert [name for _, name in class_choices()] == ['JSS 3C']
@@ -0,0 +1,77 @@
+from models import db, Answer, Attempt, Exam, Question
+
+
+def _add_question(exam_id, correct_answer, marks, order):
+    db.session.execute(db.insert(Question).values(
+        exam_id=exam_id, question_text=f'Question {order}', question_type='true_false',
+        correct_answer=correct_answer, marks=marks, order=order))
+    Exam.questions_changed(db.session, exam_id, marks)
+    db.session.commit()
+
+
+def test_unanswered_question_scores_nothing_against_blank_correct_answer(app, school, student_client):
+    # Question.bulk_create stores '' when an uploaded question has no answer line
+    with app.app_context():
+        _add_question(school['exam'], '', 5, 3)
+
+    student_client.post('/student/exams/1/start')
+    student_client.post('/student/attempts/1/save-answer', json={'question_id': 1, 'answer_text': 'True'})
+    assert student_client.post('/student/attempts/1/submit').status_code == 302
+
+    with app.app_context():
+        blank = Answer.query.filter_by(attempt_id=1, question_id=3).one()
+        assert blank.answer_text == ''
+        assert blank.is_correct is False
+        assert blank.marks_obtained == 0
+
+        attempt = db.session.get(Attempt, 1)
+        assert attempt.total_score == 2  # only the answered 2-mark question
+        assert attempt.percentage == 20.0  # out of 2 + 3 + 5 marks
+
+
+def _foreign_question(school):
+    """A 50-mark question on another exam of the same class; returns its id"""
+    exam = Exam(title='Second Term', subject_id=school['subject'], class_id=school['class'],
+                duration_minutes=30, status='published')
+    db.session.add(exam)
+    db.session.flush()
+    question = Question(exam_id=exam.id, question_text='Other exam', question_type='true_false',
+                        correct_answer='True', marks=50, order=1)
+    db.session.add(question)
+    db.session.commit()
+    return question.id
+
+
+def test_answer_to_another_exams_question_is_rejected(app, school, student_client):
+    with app.app_context():
+        foreign_id = _foreign_question(school)
+
+    student_client.post('/student/exams/1/start')
+    response = student_client.post('/student/attempts/1/save-answer',
+                                   json={'question_id': foreign_id, 'answer_text': 'True'})
+    assert response.status_code == 400
+
+    with app.app_context():
+        assert Answer.query.filter_by(attempt_id=1, question_id=foreign_id).count() == 0
+
+
+def test_answer_to_another_exams_question_scores_nothing(app, school, student_client):
+    student_client.post('/student/exams/1/start')
+    student_client.post('/student/attempts/1/save-answer', json={'question_id': 1, 'answer_text': 'True'})
+
+    # A row that got past save_answer (e.g. saved before it checked the exam)
+    with app.app_context():
+        foreign_id = _foreign_question(school)
+        db.session.add(Answer(attempt_id=1, question_id=foreign_id, answer_text='True'))
+        db.session.commit()
+
+    assert student_client.post('/student/attempts/1/submit').status_code == 302
+
+    with app.app_context():
+        foreign = Answer.query.filter_by(attempt_id=1, question_id=foreign_id).one()
+        assert foreign.is_correct is False
+        assert foreign.marks_obtained == 0
+
+        attempt = db.session.get(Attempt, 1)
+        assert attempt.total_score == 2
+        assert attempt.percentage == 40.0  # out of 2 + 3 marks
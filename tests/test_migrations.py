@@ -0,0 +1,137 @@
+"""Upgrade a copy of the bundled database and check it behaves like a fresh one."""
+import shutil
+import sqlite3
+from pathlib import Path
+
+import pytest
+from flask_migrate import upgrade
+
+import config
+from app import create_app
+from models import db, User, Student, SchoolClass, Subject, Exam, Question, Attempt, Answer
+
+SHIPPED_DB = Path(__file__).resolve().parent.parent / 'instance' / 'cbt_app.db'
+
+
+@pytest.fixture
+def shipped_db(tmp_path):
+    """A copy of instance/cbt_app.db, not yet migrated"""
+    db_path = tmp_path / 'cbt_app.db'
+    shutil.copy(SHIPPED_DB, db_path)
+    return db_path
+
+
+def _create_app(db_path, monkeypatch):
+    monkeypatch.setitem(config.config, 'upgraded', type('UpgradedConfig', (config.TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}',
+    }))
+    return create_app('upgraded')
+
+
+@pytest.fixture
+def upgraded_app(shipped_db, monkeypatch):
+    """App on a migrated copy of instance/cbt_app.db, seeded with an attempted exam"""
+    app = _create_app(shipped_db, monkeypatch)
+
+    with app.app_context():
+        upgrade()
+
+        admin = User(email='reviewer@cbt.com', role='admin')
+        admin.set_password('admin123')
+        school_class = SchoolClass(name='JSS 2B')
+        db.session.add_all([admin, school_class])
+        db.session.flush()
+        subject = Subject(name='English', class_id=school_class.id)
+        user = User(email='pupil@cbt.com', role='student', password_hash='x')
+        db.session.add_all([subject, user])
+        db.session.flush()
+        student = Student(user_id=user.id, student_id='STU900', first_name='Ify', last_name='Eze',
+                          class_id=school_class.id)
+        exam = Exam(title='Mid Term', subject_id=subject.id, class_id=school_class.id, duration_minutes=20)
+        db.session.add_all([student, exam])
+        db.session.flush()
+        question = Question(exam_id=exam.id, question_text='q', question_type='true_false',
+                            correct_answer='True', order=1)
+        attempt = Attempt(student_id=student.id, exam_id=exam.id)
+        db.session.add_all([question, attempt])
+        db.session.flush()
+        db.session.add(Answer(attempt_id=attempt.id, question_id=question.id, answer_text='True'))
+        db.session.commit()
+    return app
+
+
+def _admin_client(app):
+    client = app.test_client()
+    client.post('/login', data={'email': 'reviewer@cbt.com', 'password': 'admin123'})
+    return client
+
+
+def test_deleting_an_exam_cascades_on_an_upgraded_database(upgraded_app):
+    with upgraded_app.app_context():
+        exam_id = db.session.scalar(db.select(Exam.id))
+
+    response = _admin_client(upgraded_app).post(f'/admin/exams/{exam_id}/delete')
+    assert response.status_code == 302
+
+    with upgraded_app.app_context():
+        for model in (Exam, Question, Attempt, Answer):
+            assert db.session.scalar(db.select(db.func.count()).select_from(model)) == 0
+
+
+def test_deleting_a_student_cascades_on_an_upgraded_database(upgraded_app):
+    with upgraded_app.app_context():
+        student_id = db.session.scalar(db.select(Student.id))
+
+    response = _admin_client(upgraded_app).post(f'/admin/students/{student_id}/delete')
+    assert response.status_code == 302
+
+    with upgraded_app.app_context():
+        assert db.session.scalar(db.select(User.id).where(User.email == 'pupil@cbt.com')) is None
+        for model in (Student, Attempt, Answer):
+            assert db.session.scalar(db.select(db.func.count()).select_from(model)) == 0
+
+
+def test_timestamps_are_filled_on_an_upgraded_database(upgraded_app):
+    with upgraded_app.app_context():
+        exam = db.session.scalar(db.select(Exam))
+        attempt = db.session.scalar(db.select(Attempt))
+        answer = db.session.scalar(db.select(Answer))
+        assert None not in (exam.created_at, exam.updated_at, attempt.started_at, answer.created_at)
+
+        # Rows written without the ORM's Python defaults get the database default
+        db.session.execute(db.text("INSERT INTO classes (name) VALUES ('Raw SQL')"))
+        assert db.session.scalar(db.text("SELECT created_at FROM classes WHERE name = 'Raw SQL'")) is not None
+
+
+def test_upgraded_database_has_the_model_indexes(upgraded_app):
+    with upgraded_app.app_context():
+        inspector = db.inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            existing = {index['name']: index['column_names'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                assert existing.get(index.name) == [column.name for column in index.columns], index.name
+
+
+def test_upgrade_recalculates_stale_exam_totals(shipped_db, monkeypatch):
+    with sqlite3.connect(shipped_db) as connection:
+        class_id = connection.execute("INSERT INTO classes (name) VALUES ('JSS 3Z')").lastrowid
+        subject_id = connection.execute(
+            "INSERT INTO subjects (name, class_id) VALUES ('Biology', ?)", (class_id,)).lastrowid
+        exam_ids = [
+            connection.execute(
+                'INSERT INTO exams (title, subject_id, class_id, duration_minutes, total_marks) '
+                'VALUES (?, ?, ?, 30, ?)', (title, subject_id, class_id, stale_total)).lastrowid
+            for title, stale_total in (('Stale', 99), ('Empty', 7))
+        ]
+        connection.executemany(
+            'INSERT INTO questions (exam_id, question_text, question_type, marks, correct_answer) '
+            "VALUES (?, 'q', 'true_false', ?, 'True')", [(exam_ids[0], 2), (exam_ids[0], 3)])
+    connection.close()
+
+    app = _create_app(shipped_db, monkeypatch)
+    with app.app_context():
+        upgrade()
+        totals = dict(db.session.execute(
+            db.select(Exam.id, Exam.total_marks).where(Exam.id.in_(exam_ids))).all())
+
+    assert totals == {exam_ids[0]: 5, exam_ids[1]: 0}
@@ -0,0 +1,29 @@
+import pytest
+
+from models import db, User
+
+
+@pytest.mark.parametrize('method', ['scrypt', 'pbkdf2:sha256', 'pbkdf2:sha256:2000'])
+def test_short_hash_method_is_not_rehashed_on_every_login(app, school, method):
+    app.config['PASSWORD_HASH_METHOD'] = method
+
+    with app.app_context():
+        user = db.session.scalars(db.select(User).filter_by(email='student@cbt.com')).one()
+        assert user.check_password('student123')  # upgrades the fixture's pbkdf2:sha256:1000 hash
+        db.session.commit()
+        upgraded = user.password_hash
+
+        assert not user.password_needs_rehash()
+        assert user.check_password('student123')
+        assert user.password_hash == upgraded
+
+
+def test_hash_from_another_method_is_upgraded_on_login(app, school):
+    with app.app_context():
+        user = db.session.scalars(db.select(User).filter_by(email='student@cbt.com')).one()
+        app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+        assert user.password_needs_rehash()
+
+        assert user.check_password('student123')
+        assert user.password_hash.startswith('pbkdf2:sha256:2000$')
+        assert not user.password_needs_rehash()
@@ -0,0 +1,50 @@
+import io
+
+from openpyxl import Workbook
+
+from models import Student
+from utils import parse_excel_students
+
+
+def _workbook(*rows):
+    workbook = Workbook()
+    for row in rows:
+        workbook.active.append(row)
+    stream = io.BytesIO()
+    workbook.save(stream)
+    stream.seek(0)
+    return stream
+
+
+def test_parse_excel_students_streams_rows(app, school):
+    upload = _workbook(
+        ['student_id', 'first_name', 'last_name', 'email', 'password'],
+        ['STU002', 'Bola', 'Ade', 'Bola@CBT.com', 'secret'],
+        [None, None, None, None, None],
+        ['STU003', 'Chi', '', 'chi@cbt.com', 'secret'],
+        ['STU004', 'Dayo', 'Eze', 'student@cbt.com', 'secret'],
+        ['STU005', 'Efe', 'Okon', 'efe@cbt.com', 'secret'],
+    )
+
+    with app.app_context():
+        result = parse_excel_students(upload, school['class'])
+
+        assert result['success'] is True
+        assert result['students'] == ['STU002', 'STU005']
+        assert result['errors'] == [
+            'Row 4: Missing last_name',
+            'Row 5: Email student@cbt.com already exists',
+        ]
+        bola = Student.query.filter_by(student_id='STU002').one()
+        assert bola.user.email == 'bola@cbt.com'
+        assert bola.user.check_password('secret')
+
+
+def test_parse_excel_students_rejects_missing_columns(app, school):
+    upload = _workbook(['student_id', 'first_name', 'email'], ['STU002', 'Bola', 'bola@cbt.com'])
+
+    with app.app_context():
+        result = parse_excel_students(upload, school['class'])
+
+    assert result['success'] is False
+    assert 'Missing required columns' in result['message']
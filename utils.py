@@ -1,71 +1,138 @@
-import pandas as pd
-from docx import Document
-import PyPDF2
+import io
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from flask import current_app
+from werkzeug.security import generate_password_hash
 from models import db, User, Student, SchoolClass
 
 
-def parse_excel_students(file_path, class_id):
+def sql_budget(max_queries):
+    """Declare how many queries a view may issue (see check_query_count in app.py)"""
+    def decorator(f):
+        f.sql_budget = max_queries
+        return f
+    return decorator
+
+# openpyxl, python-docx and PyPDF2 are imported inside the parsers that need
+# them, so app workers don't pay their import cost until an upload happens.
+
+
+def _cell_text(value):
+    """Cell value as stripped text, with empty cells as ''"""
+    return '' if value is None else str(value).strip()
+
+
+def parse_excel_students(file, class_id):
     """
     Parse Excel file for student bulk upload.
     Expected columns: student_id, first_name, last_name, email, password
+
+    file may be a path or a file-like object such as an upload's stream; the
+    workbook is read row by row in openpyxl's read-only mode.
     """
+    from openpyxl import load_workbook
+
     try:
-        df = pd.read_excel(file_path)
-        df.columns = df.columns.str.strip()  # Clean headers
-
-        required_columns = ['student_id', 'first_name', 'last_name', 'email', 'password']
-        if not all(col in df.columns for col in required_columns):
-            return {'success': False, 'message': f'Missing required columns. Expected: {required_columns}'}
-
-        students_created = []
-        errors = []
-
-        for idx, row in df.iterrows():
-            try:
-                student_id = str(row['student_id']).strip()
-                email = str(row['email']).strip().lower()
-                first_name = str(row['first_name']).strip()
-                last_name = str(row['last_name']).strip()
-
-                # Duplicate checks
-                if User.query.filter_by(email=email).first():
-                    errors.append(f"Row {idx+2}: Email {email} already exists")
+        # Read-only mode streams the sheet XML instead of building every cell
+        # object; rows are consumed as they are read and the file is closed
+        # once the sheet has been parsed
+        workbook = load_workbook(file, read_only=True, data_only=True, keep_links=False)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [_cell_text(value) for value in next(rows, ())]  # Clean headers
+
+            required_columns = ['student_id', 'first_name', 'last_name', 'email', 'password']
+            if not all(col in header for col in required_columns):
+                return {'success': False, 'message': f'Missing required columns. Expected: {required_columns}'}
+            columns = {col: header.index(col) for col in required_columns}
+
+            parsed = []
+            errors = []
+
+            for row_number, values in enumerate(rows, start=2):
+                if all(value is None for value in values):
                     continue
-
-                if Student.query.filter_by(student_id=student_id).first():
-                    errors.append(f"Row {idx+2}: Student ID {student_id} already exists")
+                row = {col: _cell_text(values[i]) if i < len(values) else '' for col, i in columns.items()}
+                missing = [col for col in required_columns if not row[col]]
+                if missing:
+                    errors.append(f"Row {row_number}: Missing {', '.join(missing)}")
                     continue
+                row['email'] = row['email'].lower()
+                parsed.append((row_number, row))
+        finally:
+            workbook.close()
+
+        # Existing emails, student IDs and names in this class, fetched with
+        # one IN query each instead of three lookups per row
+        emails = set(db.session.scalars(
+            db.select(User.email).where(User.email.in_({row['email'] for _, row in parsed}))))
+        student_ids = set(db.session.scalars(
+            db.select(Student.student_id).where(Student.student_id.in_({row['student_id'] for _, row in parsed}))))
+        names = set(db.session.execute(
+            db.select(Student.first_name, Student.last_name).where(Student.class_id == class_id)).tuples())
+
+        user_rows = []
+        student_rows = []
+
+        for row_number, row in parsed:
+            student_id = row['student_id']
+            email = row['email']
+            first_name = row['first_name']
+            last_name = row['last_name']
+
+            # Duplicate checks, also against rows accepted earlier in this file
+            if email in emails:
+                errors.append(f"Row {row_number}: Email {email} already exists")
+                continue
 
-                if Student.query.filter_by(first_name=first_name, last_name=last_name, class_id=class_id).first():
-                    errors.append(f"Row {idx+2}: Student {first_name} {last_name} already exists in this class")
-                    continue
+            if student_id in student_ids:
+                errors.append(f"Row {row_number}: Student ID {student_id} already exists")
+                continue
 
-                # Create User
-                user = User(email=email, role='student')
-                user.set_password(str(row['password']))
-                db.session.add(user)
-                db.session.flush()  # Get user.id
-
-                # Create Student
-                student = Student(
-                    user_id=user.id,
-                    student_id=student_id,
-                    first_name=first_name,
-                    last_name=last_name,
-                    class_id=class_id
-                )
-                db.session.add(student)
-                students_created.append(student_id)
-
-            except Exception as e:
-                db.session.rollback()
-                errors.append(f"Row {idx+2}: {str(e)}")
+            if (first_name, last_name) in names:
+                errors.append(f"Row {row_number}: Student {first_name} {last_name} already exists in this class")
                 continue
 
-        if students_created:
+            emails.add(email)
+            student_ids.add(student_id)
+            names.add((first_name, last_name))
+
+            user_rows.append({
+                'email': email,
+                'password': row['password'],
+                'role': 'student',
+                'is_active': True
+            })
+            student_rows.append({
+                'student_id': student_id,
+                'first_name': first_name,
+                'last_name': last_name,
+                'class_id': class_id
+            })
+
+        # Insert users, then their student profiles, as two executemany batches;
+        # new user ids are read back by (unique) email rather than per-row RETURNING
+        if user_rows:
+            # Hashing dominates a large upload; hashlib releases the GIL, so
+            # worker threads spread it over PASSWORD_HASH_WORKERS cores
+            hash_password = partial(generate_password_hash, method=current_app.config['PASSWORD_HASH_METHOD'])
+            with ThreadPoolExecutor(max_workers=current_app.config['PASSWORD_HASH_WORKERS']) as pool:
+                hashes = pool.map(hash_password, [user_row.pop('password') for user_row in user_rows])
+                for user_row, password_hash in zip(user_rows, hashes):
+                    user_row['password_hash'] = password_hash
+
+            db.session.execute(db.insert(User), user_rows)
+            user_ids = dict(db.session.execute(
+                db.select(User.email, User.id).where(User.email.in_([row['email'] for row in user_rows]))
+            ).all())
+            for user_row, student_row in zip(user_rows, student_rows):
+                student_row['user_id'] = user_ids[user_row['email']]
+            db.session.execute(db.insert(Student), student_rows)
             db.session.commit()
 
+        students_created = [row['student_id'] for row in student_rows]
+
         return {
             'success': True,
             'created': len(students_created),
@@ -74,10 +141,11 @@ def parse_excel_students(file_path, class_id):
         }
 
     except Exception as e:
+        db.session.rollback()
         return {'success': False, 'message': f'Error parsing Excel: {str(e)}'}
 
 
-def parse_questions_from_word(file_path):
+def parse_questions_from_word(file):
     """
     Parse questions from Word document.
     Supported formats: MCQ and True/False only
@@ -90,9 +158,13 @@ def parse_questions_from_word(file_path):
     D) Option D
     Answer: A
     Marks: 2
+
+    file may be a path or a file-like object.
     """
+    from docx import Document
+
     try:
-        doc = Document(file_path)
+        doc = Document(file)
         questions = []
         current_question = {}
 
@@ -149,61 +221,62 @@ def parse_questions_from_word(file_path):
         return {'success': False, 'message': f'Error parsing Word document: {str(e)}'}
 
 
-def parse_questions_from_pdf(file_path):
+def parse_questions_from_pdf(file):
     """
     Parse questions from PDF document.
     Supported formats: MCQ and True/False only
-    Same format as Word document.
+    Same format as Word document; file may be a path or a file-like object.
     """
+    import PyPDF2
+
     try:
         questions = []
         current_question = {}
 
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-
-            for page in pdf_reader.pages:
-                text = page.extract_text()
-                lines = text.split('\n')
-
-                for line in lines:
-                    line = line.strip()
-
-                    if not line:
-                        continue
-
-                    # Detect question start
-                    if re.match(r'^Q\d+\.', line):
-                        if current_question:
-                            # Only add if it's MCQ or True/False
-                            if current_question.get('question_type') in ['mcq', 'true_false']:
-                                questions.append(current_question)
+        pdf_reader = PyPDF2.PdfReader(file)
 
-                        q_type = 'mcq'
-                        if '[TRUE_FALSE]' in line.upper():
-                            q_type = 'true_false'
+        for page in pdf_reader.pages:
+            text = page.extract_text()
+            lines = text.split('\n')
 
-                        current_question = {
-                            'question_text': re.sub(r'Q\d+\.\s*|\[.*?\]', '', line).strip(),
-                            'question_type': q_type,
-                            'marks': 1
-                        }
+            for line in lines:
+                line = line.strip()
 
-                    elif re.match(r'^[A-D]\)', line) and current_question.get('question_type') == 'mcq':
-                        option_letter = line[0].lower()
-                        option_text = line[2:].strip()
-                        current_question[f'option_{option_letter}'] = option_text
-
-                    elif line.lower().startswith('answer:'):
-                        answer = line.split(':', 1)[1].strip()
-                        current_question['correct_answer'] = answer
+                if not line:
+                    continue
 
-                    elif line.lower().startswith('marks:'):
-                        marks = line.split(':', 1)[1].strip()
-                        try:
-                            current_question['marks'] = int(marks)
-                        except ValueError:
-                            current_question['marks'] = 1
+                # Detect question start
+                if re.match(r'^Q\d+\.', line):
+                    if current_question:
+                        # Only add if it's MCQ or True/False
+                        if current_question.get('question_type') in ['mcq', 'true_false']:
+                            questions.append(current_question)
+
+                    q_type = 'mcq'
+                    if '[TRUE_FALSE]' in line.upper():
+                        q_type = 'true_false'
+
+                    current_question = {
+                        'question_text': re.sub(r'Q\d+\.\s*|\[.*?\]', '', line).strip(),
+                        'question_type': q_type,
+                        'marks': 1
+                    }
+
+                elif re.match(r'^[A-D]\)', line) and current_question.get('question_type') == 'mcq':
+                    option_letter = line[0].lower()
+                    option_text = line[2:].strip()
+                    current_question[f'option_{option_letter}'] = option_text
+
+                elif line.lower().startswith('answer:'):
+                    answer = line.split(':', 1)[1].strip()
+                    current_question['correct_answer'] = answer
+
+                elif line.lower().startswith('marks:'):
+                    marks = line.split(':', 1)[1].strip()
+                    try:
+                        current_question['marks'] = int(marks)
+                    except ValueError:
+                        current_question['marks'] = 1
 
         if current_question and current_question.get('question_type') in ['mcq', 'true_false']:
             questions.append(current_question)
@@ -214,20 +287,25 @@ def parse_questions_from_pdf(file_path):
         return {'success': False, 'message': f'Error parsing PDF: {str(e)}'}
 
 
-def auto_grade_answer(question, answer_text):
-    """
-    Auto-grade an answer based on question type.
-    Only supports MCQ and True/False questions.
-    Returns (is_correct, marks_obtained)
+# Question parsers by file extension, with the bytes each format starts with
+QUESTION_PARSERS = {
+    'docx': (b'PK\x03\x04', parse_questions_from_word),
+    'pdf': (b'%PDF', parse_questions_from_pdf),
+}
+
+
+def parse_questions_file(filename, data):
+    """Parse uploaded question bytes with the parser for the file's extension.
+
+    Content that does not match its extension is rejected up front rather
+    than handed to a parser that would fail on it.
     """
-    if question.question_type == 'mcq':
-        is_correct = answer_text.upper() == question.correct_answer.upper()
-        marks = question.marks if is_correct else 0
-        return is_correct, marks
+    extension = filename.rsplit('.', 1)[-1].lower()
+    if extension not in QUESTION_PARSERS:
+        return {'success': False, 'message': 'Invalid file type!'}
 
-    elif question.question_type == 'true_false':
-        is_correct = answer_text.lower() == question.correct_answer.lower()
-        marks = question.marks if is_correct else 0
-        return is_correct, marks
+    signature, parser = QUESTION_PARSERS[extension]
+    if not data.startswith(signature):
+        return {'success': False, 'message': f'File is not a valid .{extension} document'}
 
-    return False, 0
+    return parser(io.BytesIO(data))